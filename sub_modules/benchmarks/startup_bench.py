@@ -0,0 +1,70 @@
+"""
+Cold-start import budget for the Python backends.
+
+Runs each entry point in a fresh interpreter under `python -X importtime`, sums the
+top-level import times and fails if the best run exceeds the target's budget
+(the minimum is the least noisy estimate on a shared machine, as with timeit).
+
+    python sub_modules/benchmarks/startup_bench.py [--runs 5] [--scale 1.0]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+SUB_MODULES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, working directory, modules imported on a cold start, budget in ms)
+TARGETS = [
+    ("pollution_detector", os.path.join(SUB_MODULES, "pollution_detector"), ["main"], 600),
+    ("policy_feedback", os.path.join(SUB_MODULES, "policy_feedback", "backend"), ["main"], 600),
+    ("bridge", os.path.join(SUB_MODULES, "pollution_detector"), ["bridge"], 250),
+]
+
+
+def import_time_ms(cwd: str, modules: list) -> float:
+    """Total import time (ms) of a fresh interpreter importing `modules`."""
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Import failed in {cwd}:\n{proc.stderr[-2000:]}")
+
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # header line
+        name = parts[2]
+        # Top-level imports have a single space before the name; nested ones are indented further
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(parts[1])
+    return total_us / 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start import-time budget check")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slow CI machines)")
+    args = parser.parse_args()
+
+    failed = False
+    for name, cwd, modules, budget in TARGETS:
+        samples = [import_time_ms(cwd, modules) for _ in range(args.runs)]
+        median = statistics.median(samples)
+        best = min(samples)
+        limit = budget * args.scale
+        status = "OK" if best <= limit else "OVER BUDGET"
+        failed = failed or best > limit
+        print(f"{name:20s} best {best:8.1f} ms  (median {median:.1f}, budget {limit:.0f})  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Video ingestion speed: decode + keyframe selection against the clip's own duration.
+
+Writes a synthetic clip (or uses --video), runs detect_pollution_video on it and reports the
+real-time factor (clip seconds per wall-clock second). Fails if ingestion is slower than real time.
+The filename triggers the detector's offline demo mode so model latency is not measured.
+
+    python sub_modules/benchmarks/video_bench.py [--video clip.mp4] [--seconds 60] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+SUB_MODULES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(SUB_MODULES, "pollution_detector"))
+
+
+def write_synthetic_clip(path: str, seconds: float, fps: float = 25.0, size=(1280, 720)) -> float:
+    """A moving block with a new background every 10 s, so both paths of the keyframe filter run."""
+    import cv2
+    import numpy as np
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    width, height = size
+    total = int(seconds * fps)
+    for i in range(total):
+        shade = (i // int(10 * fps)) * 40 % 255
+        frame = np.full((height, width, 3), shade, dtype=np.uint8)
+        x = (i * 8) % (width - 200)
+        frame[200:400, x:x + 200] = (0, 0, 255)
+        writer.write(frame)
+    writer.release()
+    return total / fps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video ingestion real-time factor")
+    parser.add_argument("--video", help="Existing clip to measure instead of a synthetic one")
+    parser.add_argument("--seconds", type=float, default=60.0, help="Length of the synthetic clip")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--min-factor", type=float, default=1.0, help="Required clip-seconds per wall-second")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+    from video import detect_pollution_video, probe_duration
+
+    tmp_dir = None
+    if args.video:
+        path = args.video
+        duration = probe_duration(path)
+    else:
+        tmp_dir = tempfile.mkdtemp()
+        path = os.path.join(tmp_dir, "synthetic.mp4")
+        duration = write_synthetic_clip(path, args.seconds)
+
+    try:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            result = detect_pollution_video(path, "smoke_bench.mp4")
+            timings.append(time.perf_counter() - start)
+    finally:
+        if tmp_dir:
+            os.remove(path)
+            os.rmdir(tmp_dir)
+
+    median = statistics.median(timings)
+    factor = duration / median if median else float("inf")
+    print(f"clip {duration:.1f}s  median {median:.2f}s  real-time factor {factor:.1f}x  "
+          f"keyframes {len(result['timeline'])}  analyzed_until {result['analyzed_until']}s  "
+          f"truncated {result['truncated']}")
+    sys.exit(0 if factor >= args.min_factor else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Throughput scaling of the pre-fork serve entry point from 1 to N workers.
+
+Starts `main.py --workers W` for each W, drives it with keep-alive clients in separate
+processes and reports requests/second, speedup and per-worker efficiency.
+
+    python sub_modules/benchmarks/worker_scaling.py [--app policy|pollution] [--max-workers 4] [--duration 10]
+"""
+import argparse
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+SUB_MODULES = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APPS = {
+    "policy": os.path.join(SUB_MODULES, "policy_feedback", "backend"),
+    "pollution": os.path.join(SUB_MODULES, "pollution_detector"),
+}
+
+
+def build_request(app: str, seq: int):
+    """Returns (path, body, headers). Every body is unique so the shared result cache never hits."""
+    if app == "policy":
+        comments = [f"Request {seq}: please add more bike lanes", "Too much traffic near the school", uuid.uuid4().hex]
+        return "/analyze", json.dumps({"comments": comments}).encode(), {"Content-Type": "application/json"}
+
+    # Offline demo mode (keyword in filename) keeps the upstream models out of the measurement
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (320, 240), (seq % 256, (seq // 256) % 256, os.getpid() % 256)).save(buffer, format="JPEG")
+    image = buffer.getvalue()
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="smoke_{seq}.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + image + f"\r\n--{boundary}--\r\n".encode()
+    return "/analyze", body, {"Content-Type": f"multipart/form-data; boundary={boundary}"}
+
+
+def client_loop(args):
+    app, port, stop_at = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    done = 0
+    seq = 0
+    while time.time() < stop_at:
+        seq += 1
+        path, body, headers = build_request(app, seq)
+        conn.request("POST", path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        if response.status < 500:
+            done += 1
+    conn.close()
+    return done
+
+
+def wait_ready(port: int, timeout: float = 60.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def measure(app: str, workers: int, clients: int, duration: float, port: int) -> float:
+    env = dict(os.environ)
+    env["POLLUFIGHT_STATE_DB"] = os.path.join(tempfile.mkdtemp(), "bench_state.db")
+    env["HUGGINGFACE_API_TOKEN"] = ""
+    env["HUGGINGFACEHUB_API_TOKEN"] = ""
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"],
+        cwd=APPS[app], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_ready(port)
+        stop_at = time.time() + duration
+        with multiprocessing.Pool(clients) as pool:
+            total = sum(pool.map(client_loop, [(app, port, stop_at)] * clients))
+        return total / duration
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker scaling benchmark")
+    parser.add_argument("--app", choices=sorted(APPS), default="policy")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    baseline = None
+    counts = sorted({1, *[w for w in (2, 4, 8, 16) if w < args.max_workers], args.max_workers})
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for workers in counts:
+        rps = measure(args.app, workers, workers * args.clients_per_worker, args.duration, args.port)
+        if not rps:
+            raise RuntimeError(f"No successful requests with {workers} worker(s)")
+        baseline = baseline or rps
+        speedup = rps / baseline
+        print(f"{workers:>7} {rps:>10.1f} {speedup:>8.2f} {speedup / workers:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
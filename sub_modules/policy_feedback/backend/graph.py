@@ -1,8 +1,8 @@
 import os
+import sys
 import json
-import httpx
-from typing import List, TypedDict
-from langgraph.graph import StateGraph, END
+from functools import lru_cache
+from typing import List, Optional, Tuple, TypedDict
 from models import DashboardReport, SentimentDistribution, DeepSentiment, ThemePillar, Innovation
 from pathlib import Path
 from dotenv import load_dotenv
@@ -13,6 +13,18 @@ env_path = current_dir / ".env"
 load_dotenv(dotenv_path=env_path)
 token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
 
+# Shared upstream-resilience helpers live in sub_modules/shared
+shared_dir = str(current_dir.parent.parent / "shared")
+if shared_dir not in sys.path:
+    sys.path.append(shared_dir)
+
+from resilience import ResultCache, UpstreamUnavailable, call_upstream, get_upstream
+
+# One breaker for the chat completions router; a full report gets REPORT_DEADLINE seconds of upstream time
+LLM_UPSTREAM = get_upstream("hf-router-chat", max_timeout=45.0)
+REPORT_DEADLINE = 60.0
+_response_cache = ResultCache(max_entries=256)
+
 # 2. Define State
 class AgentState(TypedDict):
     comments: List[str]
@@ -21,6 +33,7 @@ class AgentState(TypedDict):
     theme_map: List[ThemePillar]
     innovation_spotter: List[Innovation]
     final_report: DashboardReport
+    fallback_used: bool  # True if any node answered from cache or demo data instead of the live LLM
 
 # 3. Helper Functions
 def parse_json_garbage(text):
@@ -46,8 +59,12 @@ def parse_json_garbage(text):
 import re
 
 def call_hf_api(prompt, model_id="meta-llama/Llama-3.2-3B-Instruct"):
+    return query_llm(prompt, model_id)[0]
+
+def query_llm(prompt, model_id="meta-llama/Llama-3.2-3B-Instruct") -> Tuple[Optional[str], bool]:
+    """Returns (content, live): live is False when the answer came from the degraded-mode cache or is missing."""
     if not token or token == "your_token_here":
-        return None
+        return None, False
     
     # CORRECT Hugging Face Router endpoint
     API_URL = "https://router.huggingface.co/v1/chat/completions"
@@ -67,26 +84,39 @@ def call_hf_api(prompt, model_id="meta-llama/Llama-3.2-3B-Instruct"):
         "stream": False
     }
     
+    cache_key = ResultCache.key(model_id, prompt)
+
+    def post(timeout):
+        import httpx
+
+        with httpx.Client(timeout=timeout) as client:
+            return client.post(API_URL, headers=headers, json=payload)
+
     try:
-        with httpx.Client(timeout=45.0) as client:
-            response = client.post(API_URL, headers=headers, json=payload)
-            if response.status_code == 200:
-                result = response.json()
-                if "choices" in result and len(result["choices"]) > 0:
-                    return result["choices"][0]["message"]["content"]
-                return str(result)
+        response = call_upstream(LLM_UPSTREAM, post)
+        if response.status_code == 200:
+            result = response.json()
+            if "choices" in result and len(result["choices"]) > 0:
+                content = result["choices"][0]["message"]["content"]
             else:
-                print(f"DEBUG: API Error {response.status_code}: {response.text}")
+                content = str(result)
+            _response_cache.set(cache_key, content)
+            return content, True
+        else:
+            print(f"DEBUG: API Error {response.status_code}: {response.text}")
+    except UpstreamUnavailable as e:
+        print(f"DEBUG: Skipping API call: {e}")
     except Exception as e:
         print(f"DEBUG: Request failed: {e}")
-    return None
+    # Degraded: fall back to the last answer for the same prompt, else the node's own fallback
+    return _response_cache.get(cache_key), False
 
 # 4. Graph Nodes
 def analyze_sentiment(state: AgentState):
     comments_text = "\n".join(state["comments"][:30])
     prompt = f"Analyze community comments and return JSON.\nComments:\n{comments_text}\n\nReturn ONLY JSON:\n{{\"support\": 0-100, \"neutral\": 0-100, \"oppose\": 0-100, \"insight\": \"string\", \"reasoning\": \"string\"}}"
     
-    resp = call_hf_api(prompt)
+    resp, live = query_llm(prompt)
     data = parse_json_garbage(resp) if resp else None
     
     if data:
@@ -102,13 +132,15 @@ def analyze_sentiment(state: AgentState):
     else:
         state["vibe_check"] = SentimentDistribution(support=72, neutral=18, oppose=10)
         state["deep_sentiment"] = DeepSentiment(insight="Demo Insight", reasoning="API fallback.")
+    if not (data and live):
+        state["fallback_used"] = True
     return state
 
 def cluster_themes(state: AgentState):
     comments_text = "\n".join(state["comments"][:30])
     prompt = f"Group comments into 3-4 themes.\nComments:\n{comments_text}\n\nReturn ONLY JSON list:\n[{{\"theme\": \"name\", \"mentions\": count, \"summary\": \"text\"}}]"
     
-    resp = call_hf_api(prompt)
+    resp, live = query_llm(prompt)
     data = parse_json_garbage(resp) if resp else None
     
     if data and isinstance(data, list):
@@ -123,13 +155,15 @@ def cluster_themes(state: AgentState):
         state["theme_map"] = pillars
     else:
         state["theme_map"] = [ThemePillar(theme="General", mentions=len(state["comments"]), summary="Analysis in progress.")]
+    if not (data and isinstance(data, list) and live):
+        state["fallback_used"] = True
     return state
 
 def spot_innovation(state: AgentState):
     comments_text = "\n".join(state["comments"][:30])
     prompt = f"Identify 2 unique suggestions.\nComments:\n{comments_text}\n\nReturn ONLY JSON list:\n[{{\"idea\": \"name\", \"context\": \"text\"}}]"
     
-    resp = call_hf_api(prompt)
+    resp, live = query_llm(prompt)
     data = parse_json_garbage(resp) if resp else None
     
     if data and isinstance(data, list):
@@ -143,6 +177,8 @@ def spot_innovation(state: AgentState):
         state["innovation_spotter"] = innovations
     else:
         state["innovation_spotter"] = [Innovation(idea="Innovation Check", context="No unique ideas found yet.")]
+    if not (data and isinstance(data, list) and live):
+        state["fallback_used"] = True
     return state
 
 def compile_report(state: AgentState):
@@ -155,14 +191,25 @@ def compile_report(state: AgentState):
     return state
 
 # 5. Build Graph
-workflow = StateGraph(AgentState)
-workflow.add_node("sentiment", analyze_sentiment)
-workflow.add_node("themes", cluster_themes)
-workflow.add_node("innovation", spot_innovation)
-workflow.add_node("compile", compile_report)
-workflow.set_entry_point("sentiment")
-workflow.add_edge("sentiment", "themes")
-workflow.add_edge("themes", "innovation")
-workflow.add_edge("innovation", "compile")
-workflow.add_edge("compile", END)
-app_graph = workflow.compile()
+@lru_cache(maxsize=None)
+def get_app_graph():
+    """Builds and compiles the workflow on first use; langgraph is only imported here to keep startup fast."""
+    from langgraph.graph import StateGraph, END
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("sentiment", analyze_sentiment)
+    workflow.add_node("themes", cluster_themes)
+    workflow.add_node("innovation", spot_innovation)
+    workflow.add_node("compile", compile_report)
+    workflow.set_entry_point("sentiment")
+    workflow.add_edge("sentiment", "themes")
+    workflow.add_edge("themes", "innovation")
+    workflow.add_edge("innovation", "compile")
+    workflow.add_edge("compile", END)
+    return workflow.compile()
+
+def __getattr__(name):
+    # Keeps `from graph import app_graph` working without compiling at import time
+    if name == "app_graph":
+        return get_app_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,19 +1,29 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List
 import sys
 import os
+import json
+import asyncio
 
 # Add current directory to sys.path to allow imports from local modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-from graph import app_graph
+from graph import get_app_graph, REPORT_DEADLINE
 from models import DashboardReport
+from resilience import ResultCache, breaker_states, deadline
+from shared_state import SharedState
 
 app = FastAPI(title="Mayor's Dashboard API")
 
+# Counters, rate limits and cached reports shared by every worker process
+state = SharedState("policy_feedback")
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "0"))  # 0 disables the limit
+CACHE_TTL = 600.0
+
 # Enable CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -23,19 +33,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def count_requests(http_request: Request, call_next):
+    response = await call_next(http_request)
+    # Count by route template so scanned or unknown paths cannot add rows; static files and 404s share "other"
+    route = http_request.scope.get("route")
+    state.incr(f"requests:{route.path if route else 'other'}")
+    return response
+
 class CommentRequest(BaseModel):
     comments: List[str]
 
 @app.post("/analyze", response_model=DashboardReport)
-async def analyze_comments(request: CommentRequest):
+async def analyze_comments(request: CommentRequest, http_request: Request):
     if not request.comments:
         raise HTTPException(status_code=400, detail="No comments provided")
-    
+
+    # SQLite calls take cross-process locks; keep them off the event loop
+    if RATE_LIMIT_PER_MINUTE > 0:
+        client = http_request.client.host if http_request.client else "unknown"
+        if not await asyncio.to_thread(state.allow, client, RATE_LIMIT_PER_MINUTE):
+            raise HTTPException(status_code=429, detail="Rate limit exceeded")
+
+    cache_key = ResultCache.key("report", json.dumps(request.comments))
+    cached = await asyncio.to_thread(state.cache_get, cache_key)
+    if cached:
+        return cached
+
     try:
         # Run the LangGraph workflow
-        initial_state = {"comments": request.comments}
-        result = app_graph.invoke(initial_state)
-        return result["final_report"]
+        initial_state = {"comments": request.comments, "fallback_used": False}
+        # The graph blocks on LLM calls; run it in a thread (the deadline context is copied along)
+        with deadline(REPORT_DEADLINE):
+            result = await asyncio.to_thread(get_app_graph().invoke, initial_state)
+        report = result["final_report"]
+        # Only cache reports the LLM actually produced, never demo or degraded-cache fallbacks
+        if not result.get("fallback_used"):
+            await asyncio.to_thread(state.cache_set, cache_key, jsonable_encoder(report), CACHE_TTL)
+        return report
     except Exception as e:
         print(f"ERROR: {str(e)}")
         import traceback
@@ -44,8 +79,12 @@ async def analyze_comments(request: CommentRequest):
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    upstreams = breaker_states()
+    degraded = any(u["state"] != "closed" for u in upstreams.values())
+    counters = await asyncio.to_thread(state.counters)
+    return {"status": "degraded" if degraded else "healthy", "upstreams": upstreams, "counters": counters}
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    from serve import serve
+    # Compile the graph once in the master so forked workers share it
+    serve(app, "main:app", current_dir, default_port=8001, warmup=get_app_graph)
@@ -1,5 +1,5 @@
 import os
-import requests
+import sys
 from typing import Dict, List, Any
 from PIL import Image
 import io
@@ -7,6 +7,13 @@ from dotenv import load_dotenv
 import logging
 from typing import Optional
 
+# Shared upstream-resilience helpers live in sub_modules/shared
+shared_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared")
+if shared_dir not in sys.path:
+    sys.path.append(shared_dir)
+
+from resilience import ResultCache, UpstreamUnavailable, call_upstream, deadline, get_upstream
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,6 +27,14 @@ HF_TOKEN = os.getenv("HUGGINGFACE_API_TOKEN")
 API_URL = "https://router.huggingface.co/hf-inference/models/facebook/detr-resnet-50"
 CLASSIFICATION_API_URL = "https://router.huggingface.co/hf-inference/models/google/vit-base-patch16-224"
 
+# Upstream resilience: per-endpoint breakers, adaptive timeouts and an overall request budget
+DETR_UPSTREAM = get_upstream("hf-detr", max_timeout=30.0)
+VIT_UPSTREAM = get_upstream("hf-vit", max_timeout=30.0)
+DETECTION_DEADLINE = 35.0
+
+# Last full results per image, served while both upstreams are down
+_result_cache = ResultCache(max_entries=256)
+
 def get_headers():
     if not HF_TOKEN:
         # Don't crash if token missing in Offline Mode
@@ -94,15 +109,29 @@ def map_label_to_pollution(label: str) -> str:
         if key in label_lower: return value
     return "Unknown/General Pollution"
 
-def classify_scene(image_bytes: bytes, headers: dict) -> List[Dict]:
-    """Uses an Image Classification model to detect the general scene (e.g., Landfill)."""
+def query_model(upstream, url: str, headers: dict, image_bytes: bytes) -> Optional[Any]:
+    """
+    Posts the image to an inference endpoint through its circuit breaker.
+    Returns the parsed JSON, or None when the upstream is unavailable or the call failed.
+    """
+    # requests is imported lazily so offline/demo paths start fast
+    import requests
+
     try:
-        response = requests.post(CLASSIFICATION_API_URL, headers=headers, data=image_bytes, timeout=30)
-        if response.status_code == 200:
-             return response.json()
+        response = call_upstream(
+            upstream, lambda timeout: requests.post(url, headers=headers, data=image_bytes, timeout=timeout)
+        )
+    except UpstreamUnavailable as e:
+        logger.warning(f"Skipping {upstream.name}: {e}")
+        return None
     except Exception as e:
-        logger.warning(f"Scene classification failed: {e}")
-    return []
+        logger.error(f"{upstream.name} call failed: {e}")
+        return None
+
+    if response.status_code == 200:
+        return response.json()
+    logger.warning(f"{upstream.name} returned {response.status_code}")
+    return None
 
 def detect_pollution(image: Optional[Image.Image] = None, filename: str = "") -> Dict[str, Any]:
     """
@@ -172,46 +201,49 @@ def detect_pollution(image: Optional[Image.Image] = None, filename: str = "") ->
         
         headers["Content-Type"] = "image/jpeg"
 
-        # 1. Object Detection
-        logger.info(f"Running Object Detection on {API_URL}")
-        det_response = None
-        try:
-            det_response = requests.post(API_URL, headers=headers, data=img_bytes, timeout=30)
-        except Exception as e:
-            logger.error(f"DETR Call Failed: {e}")
+        with deadline(DETECTION_DEADLINE):
+            # 1. Object Detection
+            logger.info(f"Running Object Detection on {API_URL}")
+            det_results = query_model(DETR_UPSTREAM, API_URL, headers, img_bytes)
 
-        det_results = []
-        if det_response and det_response.status_code == 200:
-            det_results = det_response.json()
+            # 2. Scene Classification
+            logger.info(f"Running Scene Classification")
+            cls_results = query_model(VIT_UPSTREAM, CLASSIFICATION_API_URL, headers, img_bytes)
 
-        # 2. Scene Classification
-        logger.info(f"Running Scene Classification")
-        cls_results = classify_scene(img_bytes, headers)
+        # Degraded mode: serve a cached full result if we have one, otherwise whatever half answered
+        cache_key = ResultCache.key(img_bytes)
+        degraded = []
+        if det_results is None:
+            degraded.append("object detector")
+        if cls_results is None:
+            degraded.append("scene classifier")
+        if degraded:
+            cached = _result_cache.get(cache_key)
+            if cached:
+                logger.info("Upstream degraded. Returning cached result.")
+                return {
+                    **cached,
+                    "details": cached["details"] + [
+                        {"label": "Cached_Result", "score": 0.0, "source": "System: upstream unavailable"}
+                    ]
+                }
+            if len(degraded) == 2:
+                return {
+                    "pollution_type": "Error During Detection",
+                    "confidence_level": 0.0,
+                    "details": [{"label": "Error", "score": 0.0, "source": "System: inference upstreams unavailable"}]
+                }
 
         # Process Results
         pollution_scores = {}
         detected_items = []
         
-        # Process DETR
+        # Process DETR: score threshold, class-aware NMS and top-k per class (NumPy, imported lazily)
         if isinstance(det_results, list):
-            for item in det_results:
-                if not isinstance(item, dict): continue
-                label = item.get('label')
-                score = item.get('score', 0.0)
-                box = item.get('box')
-                
-                pollution_type = map_label_to_pollution(label)
-                detected_items.append({
-                    "label": label,
-                    "score": score,
-                    "pollution_type": pollution_type,
-                    "box": box,
-                    "source": "Object Detector"
-                })
-                
-                if pollution_type != "Unknown/General Pollution":
-                    if pollution_type not in pollution_scores: pollution_scores[pollution_type] = 0.0
-                    pollution_scores[pollution_type] = max(pollution_scores[pollution_type], score)
+            from postprocess import postprocess_detections
+            det_items, det_scores = postprocess_detections(det_results)
+            detected_items.extend(det_items)
+            pollution_scores.update(det_scores)
 
         # Process ViT
         if isinstance(cls_results, list):
@@ -256,11 +288,18 @@ def detect_pollution(image: Optional[Image.Image] = None, filename: str = "") ->
 
         logger.info(f"Final Decision: {best_pollution} ({confidence})")
 
-        return {
+        result = {
             "pollution_type": best_pollution,
             "confidence_level": round(confidence, 4),
             "details": detected_items
         }
+        if degraded:
+            result["details"] = detected_items + [
+                {"label": "Degraded_Mode", "score": 0.0, "source": f"System: {degraded[0]} unavailable"}
+            ]
+        else:
+            _result_cache.set(cache_key, result)
+        return result
 
     except Exception as e:
         import traceback
@@ -19,7 +19,12 @@ def generate_legal_draft(pollution_type: str, details: list) -> str:
         confidence_level = max(d['score'] for d in details)
     
     # Format details for professional listing
-    evidence_list = "\n".join([f"   - {d['label'].title()} (Confidence: {d['score']:.1%})" for d in details])
+    # Video detections carry the timestamp of the evidence frame
+    evidence_list = "\n".join([
+        f"   - {d['label'].title()} (Confidence: {d['score']:.1%})"
+        + (f" at {d['timestamp']:.1f}s" if "timestamp" in d else "")
+        for d in details
+    ])
     
     # Determine specific legal context based on pollution type
     legal_context = ""
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
@@ -6,8 +6,9 @@ from pydantic import BaseModel
 from typing import Optional
 from PIL import Image
 import io
-import requests
 import asyncio
+import logging
+import tempfile
 
 
 import sys
@@ -19,9 +20,21 @@ sys.path.append(current_dir)
 
 from detector import detect_pollution
 from drafter import generate_legal_draft
+from video import detect_pollution_video, SAMPLE_FPS
+from resilience import ResultCache, breaker_states
+from shared_state import SharedState
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Pollution Detector Backend")
 
+# Counters, rate limits and cached analyses shared by every worker process
+state = SharedState("pollution_detector")
+RATE_LIMIT_PER_MINUTE = int(os.getenv("RATE_LIMIT_PER_MINUTE", "0"))  # 0 disables the limit
+CACHE_TTL = 600.0
+# Detail labels detect_pollution adds to temporary, degraded answers; these must not be cached
+DEGRADED_MARKERS = {"Degraded_Mode", "Cached_Result"}
+
 # CORS Setup
 app.add_middleware(
     CORSMiddleware,
@@ -44,20 +57,56 @@ class AnalysisResponse(BaseModel):
     legal_draft: str
     details: list
 
+class VideoAnalysisResponse(AnalysisResponse):
+    timeline: list
+    segments: list
+    evidence_frames: list
+    analyzed_until: float
+    truncated: bool
+
+@app.middleware("http")
+async def count_requests(request: Request, call_next):
+    response = await call_next(request)
+    # Count by route template so scanned or unknown paths cannot add rows; static files and 404s share "other"
+    route = request.scope.get("route")
+    state.incr(f"requests:{route.path if route else 'other'}")
+    return response
+
+async def check_rate_limit(request: Request):
+    if RATE_LIMIT_PER_MINUTE <= 0:
+        return
+    client = request.client.host if request.client else "unknown"
+    # SQLite takes a cross-process write lock here; keep it off the event loop
+    if not await asyncio.to_thread(state.allow, client, RATE_LIMIT_PER_MINUTE):
+        raise HTTPException(status_code=429, detail="Rate limit exceeded")
+
 @app.get("/")
 def read_root():
     return FileResponse('static/index.html')
 
+@app.get("/health")
+def health_check():
+    upstreams = breaker_states()
+    degraded = any(u["state"] != "closed" for u in upstreams.values())
+    return {"status": "degraded" if degraded else "healthy", "upstreams": upstreams, "counters": state.counters()}
+
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze_image(
+    request: Request,
     file: Optional[UploadFile] = File(None),
     image_url: Optional[str] = Form(None),
     original_filename: Optional[str] = Form(None)
 ):
+    await check_rate_limit(request)
     try:
+        cache_key = None
         # Load image from file or URL
         if file:
             image_data = await file.read()
+            cache_key = ResultCache.key("analyze", file.filename, image_data)
+            cached = await asyncio.to_thread(state.cache_get, cache_key)
+            if cached:
+                return cached
             image = Image.open(io.BytesIO(image_data))
         elif image_url:
             if image_url == "skipped":
@@ -65,8 +114,15 @@ async def analyze_image(
                 await asyncio.sleep(2)
                 image = None
             else:
+                cache_key = ResultCache.key("analyze", original_filename, image_url)
+                cached = await asyncio.to_thread(state.cache_get, cache_key)
+                if cached:
+                    return cached
+
+                import requests
+
                 headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"}
-                response = requests.get(image_url, headers=headers)
+                response = await asyncio.to_thread(requests.get, image_url, headers=headers)
                 response.raise_for_status()
                 image = Image.open(io.BytesIO(response.content))
         else:
@@ -79,7 +135,8 @@ async def analyze_image(
             filename = original_filename
         else:
              filename = "unknown.jpg"
-        detection_result = detect_pollution(image, filename)
+        # Blocking upstream calls run in a thread so the event loop (and the worker heartbeat) stays live
+        detection_result = await asyncio.to_thread(detect_pollution, image, filename)
         
         pollution_type = detection_result["pollution_type"]
         confidence = detection_result["confidence_level"]
@@ -95,18 +152,81 @@ async def analyze_image(
         else:
              legal_draft = generate_legal_draft(pollution_type, details)
 
-        return {
+        result = {
             "pollution_type": pollution_type,
             "confidence_level": confidence,
             "legal_draft": legal_draft,
             "details": details
         }
+        degraded = any(d.get("label") in DEGRADED_MARKERS for d in details if isinstance(d, dict))
+        if cache_key and pollution_type != "Error During Detection" and not degraded:
+            await asyncio.to_thread(state.cache_set, cache_key, result, CACHE_TTL)
+        return result
+
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/analyze-video", response_model=VideoAnalysisResponse)
+async def analyze_video(
+    request: Request,
+    file: UploadFile = File(...),
+    sample_fps: Optional[float] = Form(None)
+):
+    await check_rate_limit(request)
+    try:
+        filename = file.filename or "unknown.mp4"
+        suffix = os.path.splitext(filename)[1] or ".mp4"
+
+        # Stream the upload to disk in chunks so large clips never sit in memory
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            while chunk := await file.read(1024 * 1024):
+                tmp.write(chunk)
+            video_path = tmp.name
+
+        try:
+            detection_result = await asyncio.to_thread(
+                detect_pollution_video, video_path, filename, sample_fps or SAMPLE_FPS
+            )
+        finally:
+            os.remove(video_path)
+
+        pollution_type = detection_result["pollution_type"]
+        details = detection_result["details"]
 
+        # Failures must not read as a clean "no pollution" notice
+        if pollution_type in ("Image Required", "Error During Detection"):
+            # The reason can carry server paths, so it is logged rather than returned
+            reason = details[0]["source"] if details else pollution_type
+            logger.warning(f"Video analysis of {filename} failed: {reason}")
+            # Nothing analysed means the clip itself was unusable; otherwise inference failed upstream
+            if detection_result["timeline"]:
+                raise HTTPException(status_code=502, detail="Detection failed on the video's keyframes")
+            raise HTTPException(status_code=422, detail="Could not decode video")
+
+        if pollution_type == "No obvious pollution detected":
+             legal_draft = "No significant pollution detected warranting a legal notice."
+        else:
+             legal_draft = generate_legal_draft(pollution_type, details)
+
+        return {**detection_result, "legal_draft": legal_draft}
+
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def warmup():
+    # Import the lazily-loaded request and video stacks once in the master so forked workers share them
+    import requests
+    try:
+        import cv2
+    except ImportError:
+        pass
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from serve import serve
+    serve(app, "main:app", current_dir, default_port=8000, warmup=warmup)
@@ -0,0 +1,100 @@
+import os
+import numpy as np
+from typing import Any, Dict, List, Tuple
+
+from detector import map_label_to_pollution
+
+# Post-processing of raw DETR output; the boxes that survive are both the evidence and the verdict input
+SCORE_THRESHOLD = float(os.getenv("DETECTION_SCORE_THRESHOLD", "0.5"))  # Boxes below this score are dropped
+IOU_THRESHOLD = float(os.getenv("DETECTION_IOU_THRESHOLD", "0.5"))      # Same-label boxes overlapping more than this are suppressed
+TOP_K_PER_CLASS = int(os.getenv("DETECTION_TOP_K", "5"))                # Boxes kept per label after suppression
+
+
+def _to_arrays(det_results: List[Dict]) -> Tuple[List[Dict], List[str], np.ndarray, np.ndarray]:
+    """Splits the raw detector JSON into parallel arrays. Items without a box get a zero-area box."""
+    items = [item for item in det_results if isinstance(item, dict)]
+    labels = [item.get("label") or "" for item in items]
+    scores = np.array([item.get("score", 0.0) for item in items], dtype=np.float64)
+    boxes = np.zeros((len(items), 4), dtype=np.float64)
+    for i, item in enumerate(items):
+        box = item.get("box")
+        if isinstance(box, dict):
+            boxes[i] = (box.get("xmin", 0), box.get("ymin", 0), box.get("xmax", 0), box.get("ymax", 0))
+    return items, labels, scores, boxes
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = IOU_THRESHOLD) -> np.ndarray:
+    """Greedy NMS. Returns indices of kept boxes in descending score order."""
+    x1, y1, x2, y2 = boxes.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def postprocess_detections(det_results: List[Dict], score_threshold: float = SCORE_THRESHOLD,
+                           iou_threshold: float = IOU_THRESHOLD,
+                           top_k: int = TOP_K_PER_CLASS) -> Tuple[List[Dict[str, Any]], Dict[str, float]]:
+    """
+    Filters raw DETR output with a score threshold, class-aware NMS and top-k per class.
+    Returns (detected_items, pollution_scores) where pollution_scores holds the best
+    score per pollution type among the returned items, excluding "Unknown/General Pollution",
+    so every verdict drawn from it is backed by a box in detected_items.
+    """
+    items, labels, scores, boxes = _to_arrays(det_results)
+    if not items:
+        return [], {}
+
+    # 1. Score threshold
+    candidates = np.flatnonzero(scores >= score_threshold)
+    if candidates.size == 0:
+        return [], {}
+
+    # 2. Class-aware NMS: shift each label's boxes into its own region so labels never overlap
+    unique_labels, class_idx = np.unique(np.asarray(labels)[candidates], return_inverse=True)
+    cand_boxes = boxes[candidates]
+    cand_scores = scores[candidates]
+    offset = (cand_boxes.max() - cand_boxes.min() + 1.0) * class_idx[:, None]
+    kept = non_max_suppression(cand_boxes + offset, cand_scores, iou_threshold)
+
+    # 3. Top-k per class: rank boxes within their label by score
+    kept_cls = class_idx[kept]
+    order = np.lexsort((-cand_scores[kept], kept_cls))
+    sorted_cls = kept_cls[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(sorted_cls)) + 1]
+    group_sizes = np.diff(np.r_[group_start, sorted_cls.size])
+    rank = np.arange(sorted_cls.size) - np.repeat(group_start, group_sizes)
+    kept = kept[order[rank < top_k]]
+    kept = kept[np.argsort(-cand_scores[kept], kind="stable")]
+
+    # 4. Per-type scores: map each unique label once, then a scatter-max over the kept boxes
+    label_types = [map_label_to_pollution(label) for label in unique_labels]
+    type_names, type_of_label = np.unique(np.asarray(label_types), return_inverse=True)
+    type_scores = np.zeros(type_names.size, dtype=np.float64)
+    np.maximum.at(type_scores, type_of_label[class_idx[kept]], cand_scores[kept])
+
+    detected_items = []
+    for k in kept:
+        item = items[candidates[k]]
+        detected_items.append({
+            "label": item.get("label"),
+            "score": float(cand_scores[k]),
+            "pollution_type": label_types[class_idx[k]],
+            "box": item.get("box"),
+            "source": "Object Detector"
+        })
+
+    pollution_scores = {
+        str(name): float(score) for name, score in zip(type_names, type_scores)
+        if name != "Unknown/General Pollution" and score > 0
+    }
+    return detected_items, pollution_scores
@@ -0,0 +1,97 @@
+from PIL import Image
+
+import detector
+from postprocess import non_max_suppression, postprocess_detections
+
+
+def box(xmin, ymin, xmax, ymax):
+    return {"xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax}
+
+
+def det(label, score, b):
+    return {"label": label, "score": score, "box": b}
+
+
+def test_below_threshold_box_neither_listed_nor_scored():
+    items, scores = postprocess_detections([
+        det("bottle", 0.42, box(0, 0, 50, 50)),
+        det("person", 0.97, box(100, 100, 200, 300)),
+    ])
+    assert [i["label"] for i in items] == ["person"]
+    assert scores == {}
+
+
+def test_every_scored_type_is_backed_by_a_listed_box():
+    items, scores = postprocess_detections([
+        det("bottle", 0.8, box(0, 0, 50, 50)),
+        det("bottle", 0.7, box(2, 2, 52, 52)),   # suppressed by the 0.8 box
+        det("car", 0.6, box(300, 300, 400, 400)),
+        det("cup", 0.3, box(500, 500, 520, 520)),
+    ])
+    assert [(i["label"], i["score"]) for i in items] == [("bottle", 0.8), ("car", 0.6)]
+    assert scores == {"Solid Waste/Garbage": 0.8, "Vehicular Emission": 0.6}
+    for p_type, score in scores.items():
+        assert max(i["score"] for i in items if i["pollution_type"] == p_type) == score
+
+
+def test_nms_is_class_aware():
+    items, _ = postprocess_detections([
+        det("bottle", 0.9, box(0, 0, 100, 100)),
+        det("cup", 0.8, box(0, 0, 100, 100)),
+    ])
+    assert sorted(i["label"] for i in items) == ["bottle", "cup"]
+
+
+def test_nms_is_class_aware_with_negative_coordinates():
+    items, _ = postprocess_detections([
+        det("bottle", 0.9, box(-100, -100, -1, -1)),
+        det("cup", 0.8, box(-100, -100, -1, -1)),
+    ])
+    assert sorted(i["label"] for i in items) == ["bottle", "cup"]
+
+
+def test_top_k_per_class():
+    dets = [det("bottle", 0.9 - i * 0.01, box(i * 100, 0, i * 100 + 50, 50)) for i in range(6)]
+    dets.append(det("car", 0.55, box(0, 500, 50, 550)))
+    items, _ = postprocess_detections(dets, top_k=2)
+    assert [i["label"] for i in items] == ["bottle", "bottle", "car"]
+    assert [i["score"] for i in items] == [0.9, 0.89, 0.55]
+
+
+def test_missing_boxes_and_junk_entries():
+    items, scores = postprocess_detections([
+        "not a dict",
+        {"label": "bottle", "score": 0.9},
+        {"label": "bottle", "score": 0.8},
+        {"score": 0.95},
+    ])
+    # Zero-area boxes never overlap, so nothing is suppressed
+    assert [i["score"] for i in items] == [0.95, 0.9, 0.8]
+    assert scores == {"Solid Waste/Garbage": 0.9}
+    assert postprocess_detections([]) == ([], {})
+
+
+def test_non_max_suppression_orders_by_score():
+    import numpy as np
+
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30]], dtype=float)
+    scores = np.array([0.5, 0.9, 0.7])
+    assert non_max_suppression(boxes, scores, 0.5).tolist() == [1, 2]
+
+
+def test_verdict_matches_evidence(monkeypatch):
+    """A sub-threshold bottle must not turn a person photo into a garbage complaint."""
+    fake = {
+        detector.DETR_UPSTREAM.name: [
+            det("bottle", 0.42, box(0, 0, 50, 50)),
+            det("person", 0.97, box(100, 100, 200, 300)),
+        ],
+        detector.VIT_UPSTREAM.name: [],
+    }
+    monkeypatch.setattr(detector, "query_model", lambda upstream, *args: fake[upstream.name])
+
+    result = detector.detect_pollution(Image.new("RGB", (64, 64)), "photo.jpg")
+
+    assert result["pollution_type"] != "Solid Waste/Garbage"
+    assert result["confidence_level"] == 0.0
+    assert [d["label"] for d in result["details"]] == ["person"]
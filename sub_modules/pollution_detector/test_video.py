@@ -0,0 +1,44 @@
+from PIL import Image, ImageDraw
+
+from video import iter_keyframes, iter_stream_frames
+
+DARK = Image.new("RGB", (160, 120), (20, 20, 20))
+BRIGHT = Image.new("RGB", (160, 120), (240, 240, 240))
+
+
+def keyframe_times(frames, fps=2.0, max_keyframes=20, known_duration=True):
+    duration = len(frames) / fps if known_duration else None
+    progress = {}
+    times = [t for _, t, _ in iter_keyframes(iter_stream_frames(frames, fps, fps), max_keyframes, duration, progress)]
+    return times, progress
+
+
+def test_short_event_in_long_static_clip_gets_keyframes():
+    # 10 minutes at 2 fps, bright from 100s to 120s
+    frames = [BRIGHT if 200 <= i < 240 else DARK for i in range(1200)]
+    times, progress = keyframe_times(frames)
+    assert 100.0 in times and 120.0 in times
+    assert len(times) < 12
+    assert progress == {"analyzed_until": 599.5, "truncated": False}
+
+
+def test_static_clip_refreshes_at_growing_intervals():
+    times, _ = keyframe_times([DARK] * 1200)
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert gaps == sorted(gaps) and gaps[0] == 30.0
+    assert len(times) <= 5
+
+
+def test_constant_change_spreads_budget_over_the_clip():
+    noise = []
+    for i in range(4):
+        image = DARK.copy()
+        ImageDraw.Draw(image).rectangle((i * 40, 0, i * 40 + 40, 120), fill=(240, 240, 240))
+        noise.append(image)
+    times, progress = keyframe_times([noise[i % 4] for i in range(1200)])
+    assert len(times) == 20
+    assert times[-1] > 500
+    assert progress["truncated"]
+
+    times, _ = keyframe_times([noise[i % 4] for i in range(1200)], known_duration=False)
+    assert 10 < len(times) < 20 and times[-1] > 300
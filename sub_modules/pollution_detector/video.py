@@ -0,0 +1,316 @@
+import heapq
+import logging
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from PIL import Image, ImageSequence
+
+from detector import detect_pollution
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keyframe sampling settings
+SAMPLE_FPS = 2.0           # Frames per second inspected for scene changes
+STREAM_FPS = 25.0          # Assumed frame rate for raw frame streams
+HASH_SIZE = 8              # dHash grid size -> 64-bit perceptual hash
+HASH_THRESHOLD = 10        # Hamming distance that counts as a scene change
+HIST_BINS = 16             # Grayscale histogram bins
+HIST_THRESHOLD = 0.25      # Histogram distance (0..1) that counts as a scene change
+MIN_KEYFRAME_GAP = 1.0     # Debounce between keyframes, avoids bursts on flicker
+MAX_KEYFRAME_INTERVAL = 30.0  # First forced refresh of a static scene; doubles after each refresh
+MAX_KEYFRAMES = 20         # Hard cap on inference calls per clip
+EVIDENCE_FRAMES = 3        # Peak-confidence frames kept as evidence
+
+# Results that carry no pollution evidence and are left out of the aggregate
+NON_DETECTIONS = {"No obvious pollution detected", "Image Required", "Error During Detection"}
+
+Frame = Tuple[int, float, Image.Image]
+
+
+def iter_video_frames(path: str, sample_fps: float = SAMPLE_FPS) -> Iterator[Frame]:
+    """
+    Lazily decodes a video file, yielding (frame_index, timestamp, image) at roughly sample_fps.
+    Skipped frames are still decoded by grab(), but never copied out or converted to PIL.
+    """
+    try:
+        import cv2
+    except ImportError as e:
+        raise RuntimeError("Video ingestion requires opencv-python-headless") from e
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or STREAM_FPS
+        step = max(1, int(round(fps / sample_fps))) if sample_fps else 1
+        index = 0
+        while cap.grab():
+            if index % step == 0:
+                ok, frame = cap.retrieve()
+                if not ok:
+                    break
+                yield index, index / fps, Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            index += 1
+    finally:
+        cap.release()
+
+
+def iter_image_frames(image: Image.Image, sample_fps: float = SAMPLE_FPS) -> Iterator[Frame]:
+    """Yields frames of an animated image (GIF/WebP/APNG) using the per-frame durations."""
+    timestamp = 0.0
+    next_sample = 0.0
+    for index, frame in enumerate(ImageSequence.Iterator(image)):
+        if not sample_fps or timestamp >= next_sample:
+            yield index, timestamp, frame.convert("RGB")
+            next_sample = timestamp + (1.0 / sample_fps if sample_fps else 0.0)
+        timestamp += frame.info.get("duration", 1000.0 / STREAM_FPS) / 1000.0
+
+
+def iter_stream_frames(frames: Iterable[Image.Image], stream_fps: float = STREAM_FPS,
+                       sample_fps: float = SAMPLE_FPS) -> Iterator[Frame]:
+    """Yields frames from an in-memory stream (e.g. a CCTV frame grabber) at roughly sample_fps."""
+    step = max(1, int(round(stream_fps / sample_fps))) if sample_fps else 1
+    for index, frame in enumerate(frames):
+        if index % step == 0:
+            yield index, index / stream_fps, frame
+
+
+def iter_frames(source: Union[str, Image.Image, Iterable[Image.Image]], sample_fps: float = SAMPLE_FPS,
+                stream_fps: float = STREAM_FPS) -> Iterator[Frame]:
+    """Picks the right frame iterator for a video path, an animated image or a frame stream."""
+    if isinstance(source, str):
+        return iter_video_frames(source, sample_fps)
+    if isinstance(source, Image.Image):
+        return iter_image_frames(source, sample_fps)
+    return iter_stream_frames(source, stream_fps, sample_fps)
+
+
+def probe_duration(source: Union[str, Image.Image, Iterable[Image.Image]],
+                   stream_fps: float = STREAM_FPS) -> Optional[float]:
+    """Clip length in seconds when it can be known up front (files, animated images, sized streams)."""
+    if isinstance(source, str):
+        try:
+            import cv2
+        except ImportError:
+            return None
+        cap = cv2.VideoCapture(source)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        finally:
+            cap.release()
+        return frames / fps if fps and frames and frames > 0 else None
+    if isinstance(source, Image.Image):
+        duration = source.info.get("duration", 1000.0 / STREAM_FPS) / 1000.0
+        return getattr(source, "n_frames", 1) * duration
+    if hasattr(source, "__len__"):
+        return len(source) / stream_fps
+    return None
+
+
+def frame_signature(image: Image.Image) -> Tuple[int, List[float]]:
+    """Computes a cheap (dHash, normalised histogram) signature on a downsampled grayscale copy."""
+    thumb = image.resize((64, 64), Image.BILINEAR).convert("L")
+
+    # Difference hash: compare horizontally adjacent pixels on a (HASH_SIZE+1) x HASH_SIZE grid
+    grid = thumb.resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR).tobytes()
+    dhash = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            i = row * (HASH_SIZE + 1) + col
+            dhash = (dhash << 1) | (grid[i] < grid[i + 1])
+
+    # Fold the 256-bin histogram into HIST_BINS and normalise
+    raw = thumb.histogram()
+    width = 256 // HIST_BINS
+    total = float(thumb.width * thumb.height)
+    hist = [sum(raw[b * width:(b + 1) * width]) / total for b in range(HIST_BINS)]
+    return dhash, hist
+
+
+def signature_distance(a: Tuple[int, List[float]], b: Tuple[int, List[float]]) -> Tuple[int, float]:
+    """Returns (hamming distance between hashes, total-variation distance between histograms)."""
+    hamming = bin(a[0] ^ b[0]).count("1")
+    hist_dist = 0.5 * sum(abs(x - y) for x, y in zip(a[1], b[1]))
+    return hamming, hist_dist
+
+
+def keyframe_allowance(timestamp: float, max_keyframes: int, duration: Optional[float] = None) -> int:
+    """
+    Keyframes that may have been spent by `timestamp`. Half the budget is available up front for
+    bursts of activity; the rest is earned over the clip, linearly when the duration is known and
+    with the log of the time covered otherwise, so early flicker cannot starve the end of a clip.
+    """
+    burst = max(1, max_keyframes // 2)
+    rest = max_keyframes - burst
+    if duration:
+        earned = math.ceil(rest * min(1.0, timestamp / duration))
+    else:
+        earned = min(rest, int(math.log2(1.0 + timestamp / MAX_KEYFRAME_INTERVAL)))
+    return burst + earned
+
+
+def iter_keyframes(frames: Iterable[Frame], max_keyframes: int = MAX_KEYFRAMES,
+                   duration: Optional[float] = None, progress: Optional[Dict[str, Any]] = None) -> Iterator[Frame]:
+    """
+    Filters sampled frames down to scene changes.
+    Only a change against the last keyframe (debounced by MIN_KEYFRAME_GAP) spends the budget
+    freely, within keyframe_allowance(). A static scene is refreshed after MAX_KEYFRAME_INTERVAL,
+    and the interval doubles with every refresh until the scene changes again.
+    `progress` receives `analyzed_until` and `truncated` (budget spent before the end of the clip).
+    Only the signature of the last keyframe is kept, so memory stays constant for any clip length.
+    """
+    if progress is None:
+        progress = {}
+    progress.update({"analyzed_until": 0.0, "truncated": False})
+    last_sig = None
+    last_time = 0.0
+    refresh_interval = MAX_KEYFRAME_INTERVAL
+    emitted = 0
+    for index, timestamp, image in frames:
+        sig = None
+        changed = False
+        wanted = last_sig is None
+        elapsed = timestamp - last_time
+        if not wanted and elapsed >= MIN_KEYFRAME_GAP:
+            sig = frame_signature(image)
+            hamming, hist_dist = signature_distance(sig, last_sig)
+            changed = hamming > HASH_THRESHOLD or hist_dist > HIST_THRESHOLD
+            wanted = changed or elapsed >= refresh_interval
+
+        if wanted and emitted >= max_keyframes:
+            logger.info(f"Keyframe budget of {max_keyframes} spent at {timestamp:.1f}s")
+            progress["truncated"] = True
+            break
+        progress["analyzed_until"] = round(timestamp, 2)
+        if not wanted or emitted >= keyframe_allowance(timestamp, max_keyframes, duration):
+            continue  # A lasting change still fires once the allowance catches up
+
+        # Static scenes are refreshed ever more rarely; a real change resets the interval
+        refresh_interval = refresh_interval * 2 if last_sig is not None and not changed else MAX_KEYFRAME_INTERVAL
+        last_sig = sig or frame_signature(image)
+        last_time = timestamp
+        emitted += 1
+        yield index, timestamp, image
+
+
+def detect_pollution_video(source: Union[str, Image.Image, Iterable[Image.Image]], filename: str = "",
+                           sample_fps: float = SAMPLE_FPS, stream_fps: float = STREAM_FPS,
+                           max_keyframes: int = MAX_KEYFRAMES,
+                           evidence_frames: int = EVIDENCE_FRAMES) -> Dict[str, Any]:
+    """
+    Runs detect_pollution on the keyframes of a video or frame stream and aggregates
+    the per-frame results into a single time-indexed detection.
+    """
+    timeline = []
+    summary: Dict[str, Dict[str, Any]] = {}
+    evidence: List[Tuple[float, int, Dict[str, Any]]] = []
+    progress: Dict[str, Any] = {"analyzed_until": 0.0, "truncated": False}
+
+    try:
+        duration = probe_duration(source, stream_fps)
+        frames = iter_frames(source, sample_fps, stream_fps)
+        for index, timestamp, image in iter_keyframes(frames, max_keyframes, duration, progress):
+            result = detect_pollution(image, filename)
+            pollution_type = result.get("pollution_type", "Unknown")
+            confidence = result.get("confidence_level", 0.0)
+
+            timeline.append({
+                "frame_index": index,
+                "timestamp": round(timestamp, 2),
+                "pollution_type": pollution_type,
+                "confidence_level": confidence
+            })
+            if pollution_type in NON_DETECTIONS:
+                continue
+
+            entry = summary.setdefault(pollution_type, {
+                "pollution_type": pollution_type,
+                "peak_confidence": 0.0,
+                "first_seen": round(timestamp, 2),
+                "last_seen": round(timestamp, 2),
+                "keyframes": 0
+            })
+            entry["peak_confidence"] = max(entry["peak_confidence"], confidence)
+            entry["last_seen"] = round(timestamp, 2)
+            entry["keyframes"] += 1
+
+            # Keep only the top-N frames by confidence (min-heap)
+            frame_evidence = {
+                "frame_index": index,
+                "timestamp": round(timestamp, 2),
+                "pollution_type": pollution_type,
+                "confidence_level": confidence,
+                "details": result.get("details", [])
+            }
+            if len(evidence) < evidence_frames:
+                heapq.heappush(evidence, (confidence, index, frame_evidence))
+            elif confidence > evidence[0][0]:
+                heapq.heapreplace(evidence, (confidence, index, frame_evidence))
+    except Exception as e:
+        import traceback
+        logger.error(f"CRITICAL ERROR: {traceback.format_exc()}")
+        return {
+            "pollution_type": "Error During Detection",
+            "confidence_level": 0.0,
+            "details": [{"label": "Error", "score": 0.0, "source": str(e)}],
+            "timeline": timeline,
+            "segments": [],
+            "evidence_frames": [],
+            **progress
+        }
+
+    if not timeline:
+        return {
+            "pollution_type": "Image Required",
+            "confidence_level": 0.0,
+            "details": [{"label": "Error", "score": 0.0, "source": "System: No frames decoded"}],
+            "timeline": [],
+            "segments": [],
+            "evidence_frames": [],
+            **progress
+        }
+
+    if all(frame["pollution_type"] == "Error During Detection" for frame in timeline):
+        return {
+            "pollution_type": "Error During Detection",
+            "confidence_level": 0.0,
+            "details": [{"label": "Error", "score": 0.0, "source": "System: detection failed on every keyframe"}],
+            "timeline": timeline,
+            "segments": [],
+            "evidence_frames": [],
+            **progress
+        }
+
+    evidence_list = [item[2] for item in sorted(evidence, key=lambda e: (-e[0], e[1]))]
+    segments = sorted(summary.values(), key=lambda s: s["peak_confidence"], reverse=True)
+
+    if segments:
+        best_pollution = segments[0]["pollution_type"]
+        confidence = segments[0]["peak_confidence"]
+    else:
+        best_pollution = "No obvious pollution detected"
+        confidence = 0.0
+
+    # Flatten evidence details so the drafter can list them with their timestamps
+    details = []
+    for frame in evidence_list:
+        for item in frame["details"]:
+            details.append({**item, "timestamp": frame["timestamp"], "frame_index": frame["frame_index"]})
+
+    logger.info(f"Video Decision: {best_pollution} ({confidence}) from {len(timeline)} keyframes "
+                f"over {progress['analyzed_until']:.1f}s" + (" (truncated)" if progress["truncated"] else ""))
+
+    return {
+        "pollution_type": best_pollution,
+        "confidence_level": round(confidence, 4),
+        "details": details,
+        "timeline": timeline,
+        "segments": segments,
+        "evidence_frames": evidence_list,
+        "analyzed_until": progress["analyzed_until"],
+        "truncated": progress["truncated"]
+    }
@@ -0,0 +1,252 @@
+import contextvars
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Adaptive timeout settings
+LATENCY_WINDOW = 200       # Recent latency samples kept per endpoint
+MIN_SAMPLES = 20           # Samples needed before the p99 replaces the static timeout
+TIMEOUT_MULTIPLIER = 1.5   # Headroom on top of the observed p99
+MIN_TIMEOUT = 2.0          # Never wait less than this on a healthy endpoint
+
+# Per-request deadline shared by every upstream call made while it is active
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("upstream_deadline", default=None)
+
+
+class UpstreamUnavailable(Exception):
+    """Raised when a call is refused by an open breaker or an exhausted deadline."""
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+    Opens after `failure_threshold` consecutive failures, lets a single probe through
+    after `recovery_timeout` seconds, and closes again once that probe succeeds.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Gives back a half-open probe slot that was granted but not used."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Counts a failure. Returns True if this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                opened = self.state != OPEN
+                if opened:
+                    logger.warning(f"{self.name}: circuit opened after {self.failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                return opened
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+            return {"state": self.state, "consecutive_failures": self.failures, "retry_in": round(retry_in, 1)}
+
+
+class Upstream:
+    """An upstream endpoint: its breaker plus a rolling latency window used for adaptive timeouts."""
+
+    def __init__(self, name: str, max_timeout: float, failure_threshold: int = 3, recovery_timeout: float = 30.0):
+        self.name = name
+        self.max_timeout = max_timeout
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_timeout)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def p99(self) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+    def timeout(self, probe: bool = False) -> float:
+        """
+        Timeout for the next call: p99 with headroom, capped by max_timeout and the request deadline.
+        Half-open probes get the full max_timeout, since the upstream may have slowed down past the old p99.
+        """
+        p99 = None if probe else self.p99()
+        timeout = self.max_timeout if p99 is None else min(self.max_timeout, max(MIN_TIMEOUT, p99 * TIMEOUT_MULTIPLIER))
+        remaining = deadline_remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        return timeout
+
+    def record_latency(self, seconds: float):
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def record_failure(self):
+        # Once the breaker opens, the old latency window no longer describes the upstream;
+        # drop it so calls after recovery use max_timeout until fresh samples come in.
+        if self.breaker.record_failure():
+            with self._lock:
+                self.latencies.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        p99 = self.p99()
+        return {
+            **self.breaker.snapshot(),
+            "p99_latency": round(p99, 3) if p99 is not None else None,
+            "timeout": round(self.timeout(), 2),
+            "samples": len(self.latencies)
+        }
+
+
+_registry: Dict[str, Upstream] = {}
+_registry_lock = threading.Lock()
+
+
+def get_upstream(name: str, max_timeout: float, **kwargs) -> Upstream:
+    """Returns the shared Upstream for `name`, creating it on first use."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Upstream(name, max_timeout, **kwargs)
+        return _registry[name]
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Monitoring view of every registered upstream."""
+    with _registry_lock:
+        upstreams = list(_registry.values())
+    return {u.name: u.snapshot() for u in upstreams}
+
+
+@contextmanager
+def deadline(seconds: float):
+    """Bounds the total time spent on upstream calls; nested deadlines keep the tighter one."""
+    target = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        target = min(target, current)
+    token = _deadline.set(target)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def deadline_remaining() -> Optional[float]:
+    target = _deadline.get()
+    if target is None:
+        return None
+    return max(0.0, target - time.monotonic())
+
+
+def _default_is_failure(result: Any) -> bool:
+    status = getattr(result, "status_code", 200)
+    return status >= 500 or status == 429
+
+
+def call_upstream(upstream: Upstream, fn: Callable[[float], Any],
+                  is_failure: Callable[[Any], bool] = _default_is_failure) -> Any:
+    """
+    Calls fn(timeout) through the upstream's breaker.
+    Raises UpstreamUnavailable immediately when the breaker is open or the deadline is spent.
+    """
+    if not upstream.breaker.allow():
+        raise UpstreamUnavailable(f"{upstream.name}: circuit open")
+
+    timeout = upstream.timeout(probe=upstream.breaker.state == HALF_OPEN)
+    if timeout < 0.5:
+        upstream.breaker.release()
+        raise UpstreamUnavailable(f"{upstream.name}: request deadline exhausted")
+
+    start = time.monotonic()
+    try:
+        result = fn(timeout)
+    except Exception:
+        upstream.record_failure()
+        raise
+    elapsed = time.monotonic() - start
+
+    if is_failure(result):
+        upstream.record_failure()
+    else:
+        upstream.record_latency(elapsed)
+        upstream.breaker.record_success()
+    return result
+
+
+class ResultCache:
+    """Small thread-safe LRU with TTL, used to serve stale-but-useful results while an upstream is down."""
+
+    def __init__(self, max_entries: int = 128, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        digest = hashlib.sha1()
+        for part in parts:
+            digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
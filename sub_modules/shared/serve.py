@@ -0,0 +1,84 @@
+import argparse
+import logging
+import os
+import sys
+from typing import Any, Callable, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def parse_args(default_port: int) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve the backend with one or more worker processes")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", default_port)))
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Worker processes (default: $WEB_CONCURRENCY or CPU count)")
+    parser.add_argument("--reload", action="store_true",
+                        help="Development mode: single process, restart on code changes")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", 30)),
+                        help="Seconds in-flight requests get to finish on reload or shutdown")
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("WORKER_TIMEOUT", 120)),
+                        help="Seconds a silent worker may run before the master restarts it; "
+                             "must exceed the longest request deadline")
+    return parser.parse_args()
+
+
+def serve(app: Any, import_string: str, app_dir: str, default_port: int,
+          warmup: Optional[Callable[[], Any]] = None):
+    """
+    Pre-fork serving entry point shared by both backends.
+
+    On POSIX with gunicorn installed, the master imports the app (and runs `warmup`) once,
+    then forks uvicorn workers that share those pages copy-on-write.
+
+    Because the app is preloaded, SIGHUP only re-forks workers from the code already in the
+    master (useful to recycle memory, not to deploy). To pick up code changes without dropping
+    connections, send SIGUSR2 to the master: it re-executes itself on the same sockets with
+    the new code. Once the new master is serving, send SIGTERM to the old one, which lets
+    its workers finish their in-flight requests within --graceful-timeout.
+
+    Elsewhere it falls back to uvicorn's own multi-process mode.
+    """
+    args = parse_args(default_port)
+    import uvicorn
+
+    if args.reload:
+        uvicorn.run(import_string, host=args.host, port=args.port, reload=True, app_dir=app_dir)
+        return
+
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is None or sys.platform == "win32":
+        logger.info(f"gunicorn unavailable, starting {args.workers} uvicorn worker(s) without preload")
+        uvicorn.run(import_string if args.workers > 1 else app, host=args.host, port=args.port,
+                    workers=args.workers, app_dir=app_dir, timeout_graceful_shutdown=args.graceful_timeout)
+        return
+
+    class PreforkApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{args.host}:{args.port}")
+            self.cfg.set("workers", args.workers)
+            self.cfg.set("worker_class", "uvicorn_worker.UvicornWorker")
+            self.cfg.set("preload_app", True)
+            self.cfg.set("graceful_timeout", args.graceful_timeout)
+            self.cfg.set("timeout", args.timeout)
+            self.cfg.set("chdir", app_dir)
+
+        def load(self):
+            return app
+
+    if warmup:
+        logger.info("Warming up shared modules before fork")
+        warmup()
+
+    logger.info(f"Starting {args.workers} worker(s) on {args.host}:{args.port}")
+    PreforkApplication().run()
@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# One SQLite file shared by every worker of a service; WAL lets readers and a writer run concurrently
+DEFAULT_DB_PATH = os.getenv("POLLUFIGHT_STATE_DB", os.path.join(tempfile.gettempdir(), "pollufight_state.db"))
+FLUSH_INTERVAL = 2.0  # Seconds between batched counter writes per worker
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, window_start REAL NOT NULL, hits INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL);
+"""
+
+
+class SharedState:
+    """
+    Cross-process counters, fixed-window rate limits and a JSON result cache backed by SQLite in WAL mode.
+    Every key is prefixed with `namespace`, so services sharing the database file never see each other's rows.
+    Connections are opened lazily per process and thread, so an instance created before a
+    pre-fork server forks its workers is safe to use in every worker.
+    Counter increments are buffered in memory and flushed by a background thread, so counting
+    a request never touches SQLite. Rate limits and the cache do hit SQLite and should be called
+    off the event loop (e.g. asyncio.to_thread).
+    """
+
+    def __init__(self, namespace: str, path: str = DEFAULT_DB_PATH):
+        self.namespace = namespace
+        self.path = path
+        self._local = threading.local()
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        self._flusher_pid = None
+        if hasattr(os, "register_at_fork"):
+            # The flusher thread may hold the lock at fork time; a child must never inherit it locked
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        self._pending_lock = threading.Lock()
+        self._pending = {}
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    # ---------------- Counters ----------------
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Buffers an increment in this process; it reaches SQLite on the next flush."""
+        name = self._key(name)
+        with self._pending_lock:
+            if self._flusher_pid != os.getpid():
+                # First use in this process (or first use after fork): start a flusher
+                self._flusher_pid = os.getpid()
+                threading.Thread(target=self._flush_loop, daemon=True).start()
+                atexit.register(self.flush)
+            self._pending[name] = self._pending.get(name, 0) + amount
+
+    def _flush_loop(self):
+        pid = os.getpid()
+        while self._flusher_pid == pid:
+            time.sleep(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes this process's buffered counter increments in one transaction."""
+        with self._pending_lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        try:
+            conn = self._conn()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT INTO counters (name, value) VALUES (?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+                    list(batch.items())
+                )
+        except sqlite3.Error as e:
+            # Metrics must never fail a request; keep the increments for the next flush
+            logger.warning(f"Counter flush failed: {e}")
+            with self._pending_lock:
+                for name, amount in batch.items():
+                    self._pending[name] = self._pending.get(name, 0) + amount
+
+    def counters(self) -> Dict[str, int]:
+        """This namespace's counters, with the namespace prefix stripped."""
+        self.flush()
+        prefix = self._key("")
+        rows = self._conn().execute(
+            "SELECT name, value FROM counters WHERE substr(name, 1, ?) = ? ORDER BY name", (len(prefix), prefix)
+        ).fetchall()
+        return {name[len(prefix):]: value for name, value in rows}
+
+    # ---------------- Rate limits ----------------
+    def allow(self, key: str, limit: int, window: float = 60.0) -> bool:
+        """Fixed-window rate limit shared by all workers. Returns False once `limit` hits are used up."""
+        if limit <= 0:
+            return True
+        key = self._key(key)
+        now = time.time()
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT window_start, hits FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[0] >= window:
+                conn.execute("INSERT OR REPLACE INTO rate_limits (key, window_start, hits) VALUES (?, ?, 1)", (key, now))
+                allowed = True
+            elif row[1] < limit:
+                conn.execute("UPDATE rate_limits SET hits = hits + 1 WHERE key = ?", (key,))
+                allowed = True
+            else:
+                allowed = False
+            conn.execute("COMMIT")
+            return allowed
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            # Fail open: a locked database should not turn into an outage
+            logger.warning(f"Rate limit check failed: {e}")
+            return True
+
+    # ---------------- Result cache ----------------
+    def cache_get(self, key: str) -> Optional[Any]:
+        key = self._key(key)
+        try:
+            row = self._conn().execute(
+                "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+    def cache_set(self, key: str, value: Any, ttl: float = 600.0) -> None:
+        key = self._key(key)
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now + ttl)
+            )
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed: {e}")
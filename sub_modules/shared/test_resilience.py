@@ -0,0 +1,118 @@
+import pytest
+
+import resilience
+from resilience import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ResultCache, Upstream,
+                        UpstreamUnavailable, call_upstream, deadline)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(resilience.time, "monotonic", fake)
+    return fake
+
+
+def slow_upstream(clock, latency):
+    """An upstream call that takes `latency` seconds, or times out if given less."""
+    def call(timeout):
+        if timeout < latency:
+            clock.now += timeout
+            raise TimeoutError(f"timed out after {timeout}s")
+        clock.now += latency
+        return "ok"
+    return call
+
+
+def test_breaker_opens_then_recovers_through_one_probe(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.record_failure() is True
+    assert breaker.state == OPEN and not breaker.allow()
+
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()  # one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+
+def test_adaptive_timeout_follows_p99(clock):
+    upstream = Upstream("test", max_timeout=30)
+    assert upstream.timeout() == 30
+    for _ in range(resilience.MIN_SAMPLES):
+        upstream.record_latency(0.5)
+    assert upstream.timeout() == resilience.MIN_TIMEOUT
+    for _ in range(resilience.MIN_SAMPLES):
+        upstream.record_latency(10.0)
+    assert upstream.timeout() == 15.0
+    assert upstream.timeout(probe=True) == 30
+
+
+def test_slowed_upstream_does_not_lock_the_breaker_open(clock):
+    """p99 of 0.5s gives a 2s timeout; an upstream that settles at 2.5s must still recover."""
+    upstream = Upstream("test", max_timeout=30, failure_threshold=3, recovery_timeout=5)
+    for _ in range(50):
+        call_upstream(upstream, slow_upstream(clock, 0.5))
+    assert upstream.snapshot()["timeout"] == 2.0
+
+    slowed = slow_upstream(clock, 2.5)
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            call_upstream(upstream, slowed)
+    assert upstream.breaker.state == OPEN
+    assert upstream.snapshot()["p99_latency"] is None
+
+    clock.now += 5
+    assert call_upstream(upstream, slowed) == "ok"
+    assert upstream.breaker.state == CLOSED
+
+    # Calls after recovery keep working until a fresh window is built
+    for _ in range(50):
+        assert call_upstream(upstream, slowed) == "ok"
+    assert upstream.breaker.state == CLOSED
+    assert upstream.snapshot()["p99_latency"] == 2.5
+
+
+def test_open_breaker_and_spent_deadline_refuse_calls(clock):
+    upstream = Upstream("test", max_timeout=30, failure_threshold=1)
+    with pytest.raises(TimeoutError):
+        call_upstream(upstream, slow_upstream(clock, 60))
+    with pytest.raises(UpstreamUnavailable):
+        call_upstream(upstream, slow_upstream(clock, 0.1))
+
+    fresh = Upstream("fresh", max_timeout=30)
+    with deadline(0.2):
+        with pytest.raises(UpstreamUnavailable):
+            call_upstream(fresh, slow_upstream(clock, 0.1))
+    assert fresh.breaker.state == CLOSED and not fresh.breaker.probe_in_flight
+
+
+def test_nested_deadline_keeps_the_tighter_one(clock):
+    upstream = Upstream("test", max_timeout=30)
+    with deadline(5):
+        with deadline(60):
+            assert upstream.timeout() == 5
+        with deadline(1):
+            assert upstream.timeout() == 1
+
+
+def test_result_cache_ttl_and_lru(clock):
+    cache = ResultCache(max_entries=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    clock.now += 11
+    assert cache.get("a") is None
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+import shared_state
+from shared_state import SharedState
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "state.db")
+
+
+def test_counters_are_buffered_until_flush(db_path):
+    state = SharedState("svc", db_path)
+    reader = SharedState("svc", db_path)
+    state.incr("requests:/health")
+    state.incr("requests:/health", 2)
+    assert state._pending == {"svc:requests:/health": 3}
+    assert reader.counters() == {}
+
+    state.flush()
+    assert state._pending == {}
+    assert reader.counters() == {"requests:/health": 3}
+
+
+def test_namespaces_do_not_see_each_other(db_path):
+    pollution = SharedState("pollution_detector", db_path)
+    policy = SharedState("policy_feedback", db_path)
+    pollution.incr("requests:/analyze")
+    policy.incr("requests:/analyze", 5)
+    assert pollution.counters() == {"requests:/analyze": 1}
+    assert policy.counters() == {"requests:/analyze": 5}
+
+    assert policy.allow("10.0.0.1", limit=1)
+    assert pollution.allow("10.0.0.1", limit=1)
+
+    pollution.cache_set("key", {"pollution_type": "Smoke"})
+    assert policy.cache_get("key") is None
+    assert pollution.cache_get("key") == {"pollution_type": "Smoke"}
+
+
+def test_counters_from_forked_workers_add_up(db_path):
+    if not hasattr(os, "fork"):
+        pytest.skip("needs fork")
+    state = SharedState("svc", db_path)
+    state.incr("requests:/")  # starts the parent's flusher before forking, like a preloaded master
+    children = []
+    for _ in range(3):
+        pid = os.fork()
+        if pid == 0:
+            for _ in range(100):
+                state.incr("requests:/")
+            state.flush()
+            os._exit(0)
+        children.append(pid)
+    for pid in children:
+        assert os.waitpid(pid, 0)[1] == 0
+    assert state.counters() == {"requests:/": 301}
+
+
+def test_fixed_window_rate_limit(db_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    state = SharedState("svc", db_path)
+    assert [state.allow("client", limit=2) for _ in range(3)] == [True, True, False]
+    assert state.allow("other", limit=2)
+    assert state.allow("client", limit=0)
+
+    now[0] += 60
+    assert state.allow("client", limit=2)
+
+
+def test_cache_expires(db_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: now[0])
+    state = SharedState("svc", db_path)
+    state.cache_set("key", [1, 2], ttl=10)
+    assert state.cache_get("key") == [1, 2]
+    now[0] += 10
+    assert state.cache_get("key") is None